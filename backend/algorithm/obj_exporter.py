@@ -1,75 +1,109 @@
 from __future__ import annotations
 
-import math
-from typing import Iterable, List
+import io
+from typing import Iterable, List, TextIO
+
+import numpy as np
 
 from .processor import PiecePlan
 
+# Corner layout of the unit piece box: x/z are fixed half extents of the
+# 0.6 x 0.6 footprint, y is scaled per piece by half the piece height.
+_BASE_CORNERS = np.array(
+    [
+        [-0.3, -1.0, -0.3],
+        [0.3, -1.0, -0.3],
+        [0.3, 1.0, -0.3],
+        [-0.3, 1.0, -0.3],
+        [-0.3, -1.0, 0.3],
+        [0.3, -1.0, 0.3],
+        [0.3, 1.0, 0.3],
+        [-0.3, 1.0, 0.3],
+    ],
+    dtype=np.float64,
+)
+
+_BASE_FACES = np.array(
+    [
+        [1, 2, 3, 4],
+        [5, 6, 7, 8],
+        [1, 5, 8, 4],
+        [2, 6, 7, 3],
+        [4, 3, 7, 8],
+        [1, 2, 6, 5],
+    ],
+    dtype=np.int64,
+)
+
+_FACE_TEMPLATE = "\n".join(["f %d %d %d %d"] * len(_BASE_FACES))
+
+
+def _normalize_centers(centers: List[dict | None]) -> np.ndarray:
+    """Resolve piece centers to an (N, 3) array, filling gaps from the
+    index-based fallback grid computed in one vectorized pass."""
+
+    n = len(centers)
+    idx = np.arange(n)
+    out = np.empty((n, 3), dtype=np.float64)
+    out[:, 0] = idx * 0.65 - 2.0
+    out[:, 1] = 0.6 + idx * 0.05
+    out[:, 2] = 0.0
+    for i, center in enumerate(centers):
+        if center:
+            row = out[i]
+            row[0] = float(center.get("x", row[0]))
+            row[1] = float(center.get("y", row[1]))
+            row[2] = float(center.get("z", row[2]))
+    return out
 
-def _normalize_center(center: dict | None, idx: int) -> tuple[float, float, float]:
-    if not isinstance(center, dict):
-        center = {}
-    fallback_x = idx * 0.65 - 2.0
-    return (
-        float(center.get("x", fallback_x)),
-        float(center.get("y", 0.6 + idx * 0.05)),
-        float(center.get("z", 0.0)),
+
+def _piece_vertex_array(pieces: List[PiecePlan]) -> np.ndarray:
+    """Compute all piece vertices as one (N, 8, 3) array via broadcasting."""
+
+    angles = np.radians([piece.optimal_cut_angle or 0.0 for piece in pieces])
+    heights = np.clip(
+        [piece.mass_kg / 120 if piece.mass_kg else 0.4 for piece in pieces],
+        0.25,
+        2.5,
     )
+    centers = _normalize_centers([piece.center_of_mass for piece in pieces])
 
+    x = _BASE_CORNERS[None, :, 0]
+    y = _BASE_CORNERS[None, :, 1] * (heights[:, None] / 2)
+    z = _BASE_CORNERS[None, :, 2]
+    cos_a = np.cos(angles)[:, None]
+    sin_a = np.sin(angles)[:, None]
 
-def _piece_vertices(piece: PiecePlan, idx: int) -> List[tuple[float, float, float]]:
-    width = 0.6
-    depth = 0.6
-    height = max(0.25, min(2.5, piece.mass_kg / 120 if piece.mass_kg else 0.4))
-    half_w = width / 2
-    half_d = depth / 2
-    half_h = height / 2
-
-    base_vertices = [
-        (-half_w, -half_h, -half_d),
-        (half_w, -half_h, -half_d),
-        (half_w, half_h, -half_d),
-        (-half_w, half_h, -half_d),
-        (-half_w, -half_h, half_d),
-        (half_w, -half_h, half_d),
-        (half_w, half_h, half_d),
-        (-half_w, half_h, half_d),
-    ]
-
-    angle = math.radians(piece.optimal_cut_angle or 0.0)
-    cos_a = math.cos(angle)
-    sin_a = math.sin(angle)
-
-    cx, cy, cz = _normalize_center(piece.center_of_mass, idx)
-
-    rotated = []
-    for x, y, z in base_vertices:
-        rx = x * cos_a - z * sin_a
-        rz = x * sin_a + z * cos_a
-        rotated.append((rx + cx, y + cy, rz + cz))
+    rotated = np.stack(
+        [
+            x * cos_a - z * sin_a + centers[:, 0:1],
+            y + centers[:, 1:2],
+            x * sin_a + z * cos_a + centers[:, 2:3],
+        ],
+        axis=-1,
+    )
     return rotated
 
 
-def pieces_to_obj(pieces: Iterable[PiecePlan]) -> str:
-    lines: List[str] = ["# ReBuild Intelligence OBJ export"]
-    vertex_offset = 0
-    for idx, piece in enumerate(pieces):
-        name = piece.piece_id or f"piece-{idx + 1}"
-        vertices = _piece_vertices(piece, idx)
-        lines.append(f"o {name}")
-        for vx, vy, vz in vertices:
-            lines.append(f"v {vx:.6f} {vy:.6f} {vz:.6f}")
-        faces = [
-            (1, 2, 3, 4),
-            (5, 6, 7, 8),
-            (1, 5, 8, 4),
-            (2, 6, 7, 3),
-            (4, 3, 7, 8),
-            (1, 2, 6, 5),
-        ]
-        for a, b, c, d in faces:
-            lines.append(
-                f"f {vertex_offset + a} {vertex_offset + b} {vertex_offset + c} {vertex_offset + d}"
-            )
-        vertex_offset += len(vertices)
-    return "\n".join(lines) + "\n"
+def pieces_to_obj(pieces: Iterable[PiecePlan], out: TextIO | None = None) -> str | None:
+    """Write the OBJ export for the pieces.
+
+    When ``out`` is given, lines are written straight to it (a file or any
+    text stream) and ``None`` is returned, so large exports never hold the
+    whole document in memory. Without ``out`` the text is returned.
+    """
+
+    pieces = list(pieces)
+    buf = out if out is not None else io.StringIO()
+    buf.write("# ReBuild Intelligence OBJ export\n")
+    if pieces:
+        vertices = _piece_vertex_array(pieces).reshape(-1, 3)
+        np.savetxt(buf, vertices, fmt="v %.6f %.6f %.6f")
+        for idx, piece in enumerate(pieces):
+            name = piece.piece_id or f"piece-{idx + 1}"
+            buf.write(f"o {name}\n")
+            buf.write(_FACE_TEMPLATE % tuple((_BASE_FACES + idx * 8).ravel()))
+            buf.write("\n")
+    if out is not None:
+        return None
+    return buf.getvalue()
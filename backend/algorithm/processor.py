@@ -5,9 +5,13 @@ import io
 import json
 import math
 import os
-import random
+import re
+import string
 import zipfile
+from bisect import bisect_right
+from collections import OrderedDict
 from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
 from typing import Dict, List, Optional
 
@@ -18,8 +22,157 @@ from .geometry_pipeline import GeometryPipeline, PieceGeometry
 
 import logging
 
-
-@dataclass
+try:  # optional: C-backed JSON serialization for the LLM context payload
+    import orjson
+except ImportError:  # pragma: no cover - orjson is a soft dependency
+    orjson = None
+
+try:  # optional: single-pass multi-keyword matching for the text heuristics
+    import ahocorasick
+except ImportError:  # pragma: no cover - pyahocorasick is a soft dependency
+    ahocorasick = None
+
+try:  # optional: native-code kernels for the array statistics
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - numba is a soft dependency
+    njit = None
+    prange = range
+
+
+if njit is not None:
+
+    @njit(cache=True, fastmath=True)
+    def _mass_stats(masses: np.ndarray) -> tuple[float, float]:
+        # Welford single pass: mean and population std in one sweep instead
+        # of the two full passes (plus temporaries) of np.mean + np.std.
+        n = masses.shape[0]
+        if n == 0:
+            return 0.0, 0.0
+        mean = 0.0
+        m2 = 0.0
+        for i in range(n):
+            delta = masses[i] - mean
+            mean += delta / (i + 1)
+            m2 += delta * (masses[i] - mean)
+        return mean, math.sqrt(m2 / n)
+
+    @njit(fastmath=True, cache=True)
+    def _score_pieces(noise: np.ndarray) -> np.ndarray:
+        # Per-piece scoring is independent, so the prange loop is ready for
+        # parallel=True once piece counts outgrow the current 12-piece cap
+        # (at which size thread startup costs more than the loop). Columns
+        # follow PIECE_DTYPE order; noise columns are mass jitter, x, y, z,
+        # waste, reuse, drawn by the caller so the RNG stream stays put.
+        n = noise.shape[0]
+        out = np.empty((n, 7))
+        for i in prange(n):
+            out[i, 0] = 120.0 + 20.0 * math.sin(i) + noise[i, 0]
+            out[i, 1] = 0.5 * i + noise[i, 1]
+            out[i, 2] = noise[i, 2]
+            out[i, 3] = noise[i, 3]
+            out[i, 4] = (i * 17.5) % 180.0
+            out[i, 5] = 15.0 + noise[i, 4]
+            out[i, 6] = 50.0 + noise[i, 5]
+        return out
+
+else:
+
+    def _mass_stats(masses: np.ndarray) -> tuple[float, float]:
+        if masses.size == 0:
+            return 0.0, 0.0
+        return float(masses.mean()), float(masses.std())
+
+    def _score_pieces(noise: np.ndarray) -> np.ndarray:
+        idx = np.arange(noise.shape[0], dtype=np.float64)
+        out = np.empty((noise.shape[0], 7))
+        out[:, 0] = 120.0 + 20.0 * np.sin(idx) + noise[:, 0]
+        out[:, 1] = 0.5 * idx + noise[:, 1]
+        out[:, 2] = noise[:, 2]
+        out[:, 3] = noise[:, 3]
+        out[:, 4] = (idx * 17.5) % 180.0
+        out[:, 5] = 15.0 + noise[:, 4]
+        out[:, 6] = 50.0 + noise[:, 5]
+        return out
+
+
+def _dumps_compact(payload: object) -> str:
+    if orjson is not None:
+        return orjson.dumps(payload).decode()
+    return json.dumps(payload, separators=(",", ":"))
+
+
+# Full vocabulary consulted by the heuristic methods; matched once per input
+# field instead of one substring scan per keyword per method.
+_KEYWORDS = (
+    "earthquake",
+    "flood",
+    "hurricane",
+    "conveyor",
+    "rail",
+    "truck",
+    "rural",
+    "historic",
+    "selective",
+    "brick",
+    "lidar",
+)
+
+if ahocorasick is not None:
+    _KEYWORD_AUTOMATON = ahocorasick.Automaton()
+    for _kw in _KEYWORDS:
+        _KEYWORD_AUTOMATON.add_word(_kw, _kw)
+    _KEYWORD_AUTOMATON.make_automaton()
+
+    def _scan_hits(text: str):
+        """Yield ``(start, keyword)`` for every vocabulary match in one pass."""
+        for end, keyword in _KEYWORD_AUTOMATON.iter(text):
+            yield end - len(keyword) + 1, keyword
+
+else:
+    _KEYWORD_RE = re.compile("|".join(_KEYWORDS))
+
+    def _scan_hits(text: str):
+        """Yield ``(start, keyword)`` for every vocabulary match in one pass."""
+        for match in _KEYWORD_RE.finditer(text):
+            yield match.start(), match.group()
+
+
+# Flag-set name -> lowered-field name, in blob concatenation order.
+_FLAG_FIELDS = (
+    ("hazard", "hazard_profile"),
+    ("transport", "transport_plan"),
+    ("site", "site_location"),
+    ("description", "description"),
+    ("demolition", "demolition_notes"),
+    ("lidar", "lidar_notes"),
+)
+
+
+# Precomputed products for the branchy constants in the pollution and cost
+# models, keyed by the relevant keyword flag (True picks the adjusted value).
+_LIGHT_DB = {True: round(45 * 0.8, 1), False: round(45 * 1.1, 1)}  # rural vs. denser site
+_NOISE_DB = {True: round(60 * 1.3, 1), False: round(60 * 1.0, 1)}  # truck haulage vs. other
+_DEMO_BASE_COST = {True: 250_000 * 1.2, False: 250_000 * 1.0}  # selective demo
+
+
+@lru_cache(maxsize=64)
+def _recommendation_set(low_reuse: bool, high_roof: bool, has_lidar: bool) -> tuple[str, ...]:
+    # Only eight distinct recommendation lists exist, so cache the assembled
+    # tuples instead of rebuilding the strings on every request.
+    recs = []
+    if low_reuse:
+        recs.append("Increase selective demolition to expose longer beams for reuse.")
+    else:
+        recs.append("Current demolition strategy already optimizes reclaimed beams.")
+    if high_roof:
+        recs.append("Consider modular polycarbonate roofing to reduce new material share.")
+    if not has_lidar:
+        recs.append("Add higher resolution LiDAR scans for better fitting tolerance.")
+    recs.append("Run pre-demolition robotic path planning to reduce handling time.")
+    return tuple(recs)
+
+
+@dataclass(slots=True)
 class UploadedFileMeta:
     filename: str
     content_type: str
@@ -27,7 +180,7 @@ class UploadedFileMeta:
     path: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class ProjectInputs:
     project_name: str
     description: str
@@ -40,9 +193,26 @@ class ProjectInputs:
     lidar_notes: str
     files: List[UploadedFileMeta] = field(default_factory=list)
     scans: List[UploadedFileMeta] = field(default_factory=list)
+    # Declared so the derived caches below get slots too.
+    _lc: Dict[str, str] = field(init=False, repr=False)
+    _description_len: int = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        # Lowercase every free-text field exactly once at ingest; the
+        # keyword extraction and length heuristics read from this cache
+        # instead of re-lowering the same strings downstream.
+        self._lc = {
+            "description": self.description.lower(),
+            "transport_plan": self.transport_plan.lower(),
+            "site_location": self.site_location.lower(),
+            "hazard_profile": self.hazard_profile.lower(),
+            "demolition_notes": self.demolition_notes.lower(),
+            "lidar_notes": self.lidar_notes.lower(),
+        }
+        self._description_len = len(self.description)
 
 
-@dataclass
+@dataclass(slots=True)
 class PiecePlan:
     piece_id: str
     mass_kg: float
@@ -52,7 +222,54 @@ class PiecePlan:
     reuse_score: float
 
 
-@dataclass
+# float64 columns so the structured array carries exactly the same values
+# that end up in the JSON response.
+PIECE_DTYPE = np.dtype(
+    [
+        ("mass_kg", "f8"),
+        ("x", "f8"),
+        ("y", "f8"),
+        ("z", "f8"),
+        ("angle_deg", "f8"),
+        ("waste_reduction", "f8"),
+        ("reuse_score", "f8"),
+    ]
+)
+
+
+@dataclass(slots=True)
+class PiecePlanTable:
+    """Column-oriented companion to the ``PiecePlan`` list.
+
+    All numeric columns live in one structured record array, so downstream
+    analytics run NumPy reductions over a single contiguous allocation and
+    the dataclass instances only exist at the response boundary.
+    """
+
+    piece_ids: List[str]
+    data: np.ndarray
+
+    @property
+    def mass_kg(self) -> np.ndarray:
+        return self.data["mass_kg"]
+
+    @property
+    def angle_deg(self) -> np.ndarray:
+        return self.data["angle_deg"]
+
+    @property
+    def waste_reduction(self) -> np.ndarray:
+        return self.data["waste_reduction"]
+
+    @property
+    def reuse_score(self) -> np.ndarray:
+        return self.data["reuse_score"]
+
+    def __len__(self) -> int:
+        return len(self.piece_ids)
+
+
+@dataclass(slots=True)
 class MaterialFeasibility:
     reusable_components: List[str]
     needs_new_components: List[str]
@@ -61,7 +278,7 @@ class MaterialFeasibility:
     roof_new_pct: float
 
 
-@dataclass
+@dataclass(slots=True)
 class AlgorithmResult:
     project_name: str
     summary: str
@@ -83,27 +300,65 @@ class AlgorithmProcessor:
     """High level processor that mocks the behaviour of the future AI pipeline."""
 
     def __init__(self) -> None:
-        # Seed a deterministic generator so that previews are reproducible for demo purposes.
-        self._rng = random.Random(42)
         api_key = os.getenv("OPENAI_API_KEY")
         self._client: Optional[OpenAI] = OpenAI(api_key=api_key) if api_key else None
         self._model = os.environ.get("OPENAI_MODEL", "gpt-4.1-mini")
         self._logger = logging.getLogger(self.__class__.__name__)
         self._last_inputs: Optional[ProjectInputs] = None
         self._last_result: Optional[AlgorithmResult] = None
+        self._result_cache: OrderedDict[tuple, AlgorithmResult] = OrderedDict()
+
+    RESULT_CACHE_SIZE = 128
+
+    @staticmethod
+    def _cache_key(inputs: ProjectInputs) -> tuple:
+        """Stable hash key over everything that influences the result.
+
+        File paths are deliberately excluded: re-uploading the same payload
+        lands in a fresh upload directory but must hit the cache.
+        """
+
+        return (
+            inputs.project_name,
+            inputs.description,
+            inputs.transport_plan,
+            inputs.human_built,
+            inputs.site_location,
+            inputs.soil_profile,
+            inputs.hazard_profile,
+            inputs.demolition_notes,
+            inputs.lidar_notes,
+            tuple((f.filename, f.content_type, f.size_kb) for f in inputs.files),
+            tuple((f.filename, f.content_type, f.size_kb) for f in inputs.scans),
+        )
 
     def process(self, inputs: ProjectInputs) -> AlgorithmResult:
-        pieces = self._generate_piece_plans(inputs)
-        cutting_instructions = self._generate_cutting_plan(pieces, inputs)
-        reuse_breakdown = self._estimate_reuse(inputs, pieces)
-        disaster_simulation = self._simulate_disasters(inputs)
-        pollution_model = self._estimate_pollution(inputs)
-        environmental_impact = self._run_environmental_models(inputs, pollution_model)
-        structural_analysis = self._run_structural_analysis(pieces)
-        finite_element_analysis = self._run_finite_element_analysis(pieces, structural_analysis)
-        cost_and_carbon = self._estimate_cost_and_carbon(inputs, reuse_breakdown)
-        recommendations = self._generate_recommendations(reuse_breakdown, inputs)
-        material_feasibility = self._assess_material_feasibility(reuse_breakdown, inputs, pieces)
+        key = self._cache_key(inputs)
+        cached = self._result_cache.get(key)
+        if cached is not None:
+            self._result_cache.move_to_end(key)
+            self._last_inputs = inputs
+            self._last_result = cached
+            return cached
+
+        # A request-local deterministic PCG64 generator: identical payloads
+        # produce identical results regardless of call order (which makes
+        # the memoization above sound) and concurrent threadpool runs never
+        # interleave draws from a shared stream.
+        rng = np.random.default_rng(42)
+
+        flags = self._extract_keyword_flags(inputs)
+        pieces, table = self._generate_piece_plans(inputs, rng)
+        cutting_instructions = self._generate_cutting_plan(table, flags)
+        reuse_breakdown = self._estimate_reuse(inputs, pieces, flags)
+        disaster_simulation = self._simulate_disasters(flags)
+        pollution_model = self._estimate_pollution(flags)
+        environmental_impact = self._run_environmental_models(inputs, pollution_model, flags)
+        structural_analysis = self._run_structural_analysis(table)
+        finite_element_analysis = self._run_finite_element_analysis(pieces, structural_analysis, rng)
+        cost_and_carbon = self._estimate_cost_and_carbon(inputs, reuse_breakdown, flags)
+        recommendations = self._generate_recommendations(reuse_breakdown, flags)
+        material_feasibility = self._assess_material_feasibility(reuse_breakdown, inputs, pieces, flags)
         ai_engineering = self._run_llm_engineering(
             inputs,
             pieces,
@@ -136,6 +391,9 @@ class AlgorithmProcessor:
             material_feasibility=material_feasibility,
             ai_engineering=ai_engineering,
         )
+        self._result_cache[key] = result
+        if len(self._result_cache) > self.RESULT_CACHE_SIZE:
+            self._result_cache.popitem(last=False)
         self._last_inputs = inputs
         self._last_result = result
         return result
@@ -196,7 +454,9 @@ class AlgorithmProcessor:
             "cost_and_carbon": cost,
         }
 
-        context = json.dumps(payload, indent=2)
+        # Compact separators: indent=2 serializes ~3x slower and inflates the
+        # prompt token count for no benefit to the model.
+        context = _dumps_compact(payload)
         system_prompt = (
             "You are ReBuild Intelligence, an adaptive reuse structural engineer. "
             "Provide rigorous, practical guidance for cutting, reusing, and reinforcing salvaged materials."
@@ -245,70 +505,114 @@ class AlgorithmProcessor:
     # ------------------------------------------------------------------
     # Synthetic algorithm components
     # ------------------------------------------------------------------
-    def _generate_piece_plans(self, inputs: ProjectInputs) -> List[PiecePlan]:
+    def _generate_piece_plans(
+        self, inputs: ProjectInputs, rng: np.random.Generator
+    ) -> tuple[List[PiecePlan], PiecePlanTable]:
         base_count = max(len(inputs.files), 3)
         lidar_bonus = len(inputs.scans) * 2
         piece_count = min(base_count + lidar_bonus, 12)
 
-        pieces: List[PiecePlan] = []
-        for idx in range(piece_count):
-            mass = 120 + 20 * math.sin(idx) + self._rng.uniform(-15, 15)
-            coordinates = {
-                "x": round(0.5 * idx + self._rng.uniform(-0.25, 0.25), 2),
-                "y": round(self._rng.uniform(0.1, 4.0), 2),
-                "z": round(self._rng.uniform(-0.5, 0.5), 2),
-            }
-            angle = round((idx * 17.5) % 180, 2)
-            waste_reduction = round(15 + self._rng.uniform(0, 25), 2)
-            reuse_score = round(50 + self._rng.uniform(-10, 30), 2)
-
-            pieces.append(
-                PiecePlan(
-                    piece_id=f"piece-{idx+1}",
-                    mass_kg=round(mass, 2),
-                    center_of_mass=coordinates,
-                    optimal_cut_angle=angle,
-                    waste_reduction=waste_reduction,
-                    reuse_score=reuse_score,
-                )
+        # Fully batched synthesis: one RNG fill for all noise, the scoring
+        # kernel for the derived columns, and one np.round for the lot.
+        noise = rng.uniform(
+            low=(-15, -0.25, 0.1, -0.5, 0, -10),
+            high=(15, 0.25, 4.0, 0.5, 25, 30),
+            size=(piece_count, 6),
+        )
+        scored = np.round(_score_pieces(noise), 2)
+        data = np.empty(piece_count, dtype=PIECE_DTYPE)
+        for col, name in enumerate(PIECE_DTYPE.names):
+            data[name] = scored[:, col]
+
+        piece_ids = [f"piece-{i + 1}" for i in range(piece_count)]
+        pieces = [
+            PiecePlan(
+                piece_id=piece_ids[i],
+                mass_kg=float(row["mass_kg"]),
+                center_of_mass={"x": float(row["x"]), "y": float(row["y"]), "z": float(row["z"])},
+                optimal_cut_angle=float(row["angle_deg"]),
+                waste_reduction=float(row["waste_reduction"]),
+                reuse_score=float(row["reuse_score"]),
             )
-        return pieces
-
-    def _generate_cutting_plan(self, pieces: List[PiecePlan], inputs: ProjectInputs) -> List[str]:
-        plan = []
-        for piece in pieces:
-            instruction = (
-                f"Use KUKA beam saw at {piece.optimal_cut_angle}° for {piece.piece_id} to "
-                f"retain {piece.waste_reduction}% of volume for facade modules."
+            for i, row in enumerate(data)
+        ]
+        return pieces, PiecePlanTable(piece_ids=piece_ids, data=data)
+
+    def _generate_cutting_plan(
+        self, table: PiecePlanTable, flags: Dict[str, frozenset]
+    ) -> List[str]:
+        # One comprehension over the SoA columns; tolist() converts each
+        # column to plain floats in a single C pass rather than paying
+        # NumPy-scalar formatting per piece.
+        plan = [
+            f"Use KUKA beam saw at {angle}° for {piece_id} to "
+            f"retain {waste}% of volume for facade modules."
+            for piece_id, angle, waste in zip(
+                table.piece_ids,
+                table.angle_deg.tolist(),
+                table.waste_reduction.tolist(),
             )
-            plan.append(instruction)
-        if "conveyor" in inputs.transport_plan.lower():
+        ]
+        if "conveyor" in flags["transport"]:
             plan.append(
                 "Sync conveyor belt speed with scan throughput (0.5 m/s) to "
                 "maintain continuous material flow."
             )
         return plan
 
-    def _estimate_reuse(self, inputs: ProjectInputs, pieces: List[PiecePlan]) -> Dict[str, float]:
-        descriptive_factor = min(len(inputs.description) / 500, 1.5)
-        transport_factor = 1.1 if "rail" in inputs.transport_plan.lower() else 1.0
-        hazard_penalty = 0.9 if "earthquake" in inputs.hazard_profile.lower() else 1.0
+    def _estimate_reuse(
+        self, inputs: ProjectInputs, pieces: List[PiecePlan], flags: Dict[str, frozenset]
+    ) -> Dict[str, float]:
+        descriptive_factor = min(inputs._description_len / 500, 1.5)
+        transport_factor = 1.1 if "rail" in flags["transport"] else 1.0
+        hazard_penalty = 0.9 if "earthquake" in flags["hazard"] else 1.0
         lidar_bonus = 0.05 * len(inputs.scans)
 
-        reused_pct = max(0.0, min(95.0, 40 * descriptive_factor * transport_factor * hazard_penalty + lidar_bonus))
-        new_pct = max(0.0, 100 - reused_pct)
-        adaptive_roof_pct = min(30.0, new_pct * 0.3)
-        reclaimed_volume = reused_pct * len(pieces) * 1.2
-
-        return {
-            "reused_pct": round(reused_pct, 2),
-            "new_pct": round(new_pct, 2),
-            "roof_new_pct": round(adaptive_roof_pct, 2),
-            "reclaimed_volume_m3": round(reclaimed_volume, 2),
-        }
+        reused_pct = np.clip(
+            40 * descriptive_factor * transport_factor * hazard_penalty + lidar_bonus,
+            0.0,
+            95.0,
+        )
+        new_pct = 100 - reused_pct
+        # One vectorized round over the whole breakdown instead of four
+        # scalar round() calls.
+        out = np.round(
+            (
+                reused_pct,
+                new_pct,
+                min(30.0, new_pct * 0.3),
+                reused_pct * len(pieces) * 1.2,
+            ),
+            2,
+        )
+        return dict(
+            zip(("reused_pct", "new_pct", "roof_new_pct", "reclaimed_volume_m3"), out.tolist())
+        )
 
-    def _simulate_disasters(self, inputs: ProjectInputs) -> Dict[str, str]:
-        hazard_keywords = inputs.hazard_profile.lower()
+    def _extract_keyword_flags(self, inputs: ProjectInputs) -> Dict[str, frozenset]:
+        """Match the whole keyword vocabulary over all fields in one scan.
+
+        The fields are joined with newlines (no keyword contains one, so no
+        match can straddle a boundary) and each hit is attributed back to
+        its field by start offset, keeping the per-field semantics — e.g.
+        "flood" in the description must not set the hazard flag. Downstream
+        heuristics consult these sets instead of re-lowering and
+        substring-scanning the same fields once per keyword.
+        """
+
+        lowered = inputs._lc
+        texts = [lowered[field] for _, field in _FLAG_FIELDS]
+        starts = [0]
+        for text in texts[:-1]:
+            starts.append(starts[-1] + len(text) + 1)
+
+        hits: list[set] = [set() for _ in _FLAG_FIELDS]
+        for start, keyword in _scan_hits("\n".join(texts)):
+            hits[bisect_right(starts, start) - 1].add(keyword)
+        return {name: frozenset(found) for (name, _), found in zip(_FLAG_FIELDS, hits)}
+
+    def _simulate_disasters(self, flags: Dict[str, frozenset]) -> Dict[str, str]:
+        hazard_keywords = flags["hazard"]
         result = {
             "seismic": "Peak drift 0.9% (within code limits)",
             "wind": "Vortex shedding mitigated with brise-soleil",
@@ -322,25 +626,20 @@ class AlgorithmProcessor:
             result["wind"] = "Add tuned mass damper; double facade anchors"
         return result
 
-    def _estimate_pollution(self, inputs: ProjectInputs) -> Dict[str, float]:
-        traffic_factor = 1.3 if "truck" in inputs.transport_plan.lower() else 1.0
-        population_density = 0.8 if "rural" in inputs.site_location.lower() else 1.1
-        light_pollution = 45 * population_density
-        noise_pollution = 60 * traffic_factor
-
+    def _estimate_pollution(self, flags: Dict[str, frozenset]) -> Dict[str, float]:
+        # The tables already hold rounded values, so this is two lookups.
         return {
-            "light_db": round(light_pollution, 1),
-            "noise_db": round(noise_pollution, 1),
+            "light_db": _LIGHT_DB["rural" in flags["site"]],
+            "noise_db": _NOISE_DB["truck" in flags["transport"]],
         }
 
     def _run_environmental_models(
-        self, inputs: ProjectInputs, pollution: Dict[str, float]
+        self, inputs: ProjectInputs, pollution: Dict[str, float], flags: Dict[str, frozenset]
     ) -> Dict[str, float]:
         """Layer additional sound/light simulations on top of the coarse pollution model."""
 
-        hazard = inputs.hazard_profile.lower()
-        disaster_multiplier = 1.2 if "flood" in hazard else 1.0
-        cultural_buffer = 0.9 if "historic" in inputs.description.lower() else 1.0
+        disaster_multiplier = 1.2 if "flood" in flags["hazard"] else 1.0
+        cultural_buffer = 0.9 if "historic" in flags["description"] else 1.0
         sound_peak = pollution["noise_db"] * disaster_multiplier
         light_lux = 320 * cultural_buffer + 15 * len(inputs.files)
 
@@ -351,27 +650,27 @@ class AlgorithmProcessor:
             "nighttime_glare_index": round(light_lux / 12, 2),
         }
 
-    def _run_structural_analysis(self, pieces: List[PiecePlan]) -> Dict[str, float]:
-        masses = np.array([piece.mass_kg for piece in pieces])
-        mean_mass = float(np.mean(masses))
-        stress = 0.85 * mean_mass / max(len(pieces), 1)
+    def _run_structural_analysis(self, table: PiecePlanTable) -> Dict[str, float]:
+        mean_mass, std_mass = _mass_stats(table.mass_kg)
+        stress = 0.85 * mean_mass / max(len(table), 1)
         safety_factor = 1.5 * (100 / (stress + 1e-3))
-        vibration = 0.25 * np.std(masses)
+        vibration = 0.25 * std_mass
 
-        return {
-            "mean_piece_mass": round(mean_mass, 2),
-            "global_stress_index": round(stress, 2),
-            "safety_factor": round(safety_factor, 2),
-            "vibration_risk": round(vibration, 2),
-        }
+        out = np.round((mean_mass, stress, safety_factor, vibration), 2)
+        return dict(
+            zip(
+                ("mean_piece_mass", "global_stress_index", "safety_factor", "vibration_risk"),
+                out.tolist(),
+            )
+        )
 
     def _run_finite_element_analysis(
-        self, pieces: List[PiecePlan], structural: Dict[str, float]
+        self, pieces: List[PiecePlan], structural: Dict[str, float], rng: np.random.Generator
     ) -> Dict[str, float]:
         node_count = max(len(pieces) * 8, 16)
         # synthetic nodal stress distribution
         load_vector = np.linspace(0.7, 1.3, node_count)
-        random_offsets = np.array([self._rng.uniform(-0.08, 0.08) for _ in range(node_count)])
+        random_offsets = rng.uniform(-0.08, 0.08, node_count)
         stress_map = load_vector + random_offsets
         critical_idx = int(np.argmax(stress_map))
         max_displacement = float(np.max(stress_map) * 12)
@@ -384,42 +683,63 @@ class AlgorithmProcessor:
             "stress_utilization_pct": round(utilization * 100, 1),
         }
 
-    def _estimate_cost_and_carbon(self, inputs: ProjectInputs, reuse: Dict[str, float]) -> Dict[str, float]:
+    def _estimate_cost_and_carbon(
+        self, inputs: ProjectInputs, reuse: Dict[str, float], flags: Dict[str, frozenset]
+    ) -> Dict[str, float]:
         reused_pct = reuse["reused_pct"]
-        demolition_complexity = 1.2 if "selective" in inputs.demolition_notes.lower() else 1.0
         lidar_cost = 2_000 * len(inputs.scans)
-        baseline_cost = 250_000 * demolition_complexity
+        baseline_cost = _DEMO_BASE_COST["selective" in flags["demolition"]]
         savings = baseline_cost * (reused_pct / 120)
         carbon_savings = reused_pct * 1.8
 
-        return {
-            "baseline_cost": round(baseline_cost + lidar_cost, 2),
-            "reclaimed_savings": round(savings, 2),
-            "net_cost": round(baseline_cost + lidar_cost - savings, 2),
-            "co2_saved_tons": round(carbon_savings, 2),
-            "recycled_material_value": round(reused_pct * 950, 2),
-        }
+        out = np.round(
+            (
+                baseline_cost + lidar_cost,
+                savings,
+                baseline_cost + lidar_cost - savings,
+                carbon_savings,
+                reused_pct * 950,
+            ),
+            2,
+        )
+        return dict(
+            zip(
+                (
+                    "baseline_cost",
+                    "reclaimed_savings",
+                    "net_cost",
+                    "co2_saved_tons",
+                    "recycled_material_value",
+                ),
+                out.tolist(),
+            )
+        )
 
-    def _generate_recommendations(self, reuse: Dict[str, float], inputs: ProjectInputs) -> List[str]:
-        recs = []
-        if reuse["reused_pct"] < 60:
-            recs.append("Increase selective demolition to expose longer beams for reuse.")
-        else:
-            recs.append("Current demolition strategy already optimizes reclaimed beams.")
-        if reuse["roof_new_pct"] > 10:
-            recs.append("Consider modular polycarbonate roofing to reduce new material share.")
-        if "lidar" not in inputs.lidar_notes.lower():
-            recs.append("Add higher resolution LiDAR scans for better fitting tolerance.")
-        recs.append("Run pre-demolition robotic path planning to reduce handling time.")
-        return recs
+    def _generate_recommendations(
+        self, reuse: Dict[str, float], flags: Dict[str, frozenset]
+    ) -> List[str]:
+        # The branches only see these three booleans, so they double as an
+        # exact memoization key; a fresh list is returned so callers cannot
+        # mutate the cached tuple.
+        return list(
+            _recommendation_set(
+                reuse["reused_pct"] < 60,
+                reuse["roof_new_pct"] > 10,
+                "lidar" in flags["lidar"],
+            )
+        )
 
     def _assess_material_feasibility(
-        self, reuse: Dict[str, float], inputs: ProjectInputs, pieces: List[PiecePlan]
+        self,
+        reuse: Dict[str, float],
+        inputs: ProjectInputs,
+        pieces: List[PiecePlan],
+        flags: Dict[str, frozenset],
     ) -> MaterialFeasibility:
         reusable_components = ["façade panels", "floor slabs", "timber joists"]
         needs_new_components = ["roof membranes"]
 
-        if "brick" in inputs.demolition_notes.lower():
+        if "brick" in flags["demolition"]:
             reusable_components.append("salvaged brick cladding")
         if reuse["reused_pct"] < 50:
             needs_new_components.append("primary core shear walls")
@@ -432,7 +752,7 @@ class AlgorithmProcessor:
         ]
         if reuse["reused_pct"] < 70:
             suggested_changes.append("Relocate conveyor buffer closer to demolition face to limit waste.")
-        if "flood" in inputs.hazard_profile.lower():
+        if "flood" in flags["hazard"]:
             suggested_changes.append("Raise reused modules by 0.6m to clear flood design level.")
 
         recycled_ratio = reuse["reused_pct"] / 100
@@ -539,7 +859,13 @@ class AlgorithmProcessor:
         r, g, b = colorsys.hsv_to_rgb(hue, 0.55, 0.9)
         return r, g, b
 
-    @staticmethod
-    def _sanitize_piece_id(piece_id: str) -> str:
-        safe = piece_id.replace(" ", "-").lower()
-        return safe or "piece"
+    # Same single-pass table as GeometryPipeline._sanitize_piece_id.
+    _SANITIZE_TABLE = str.maketrans(
+        {" ": "-", **{c: c.lower() for c in string.ascii_uppercase}}
+    )
+
+    @classmethod
+    def _sanitize_piece_id(cls, piece_id: str) -> str:
+        if piece_id.isascii() and piece_id.islower() and " " not in piece_id:
+            return piece_id or "piece"
+        return piece_id.translate(cls._SANITIZE_TABLE) or "piece"
@@ -1,19 +1,47 @@
 from __future__ import annotations
 
+import asyncio
 import os
+from collections import OrderedDict
 from pathlib import Path
 from typing import List
 
+import aiofiles
 import logging
 
+import orjson
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response
-from fastapi.encoders import jsonable_encoder
 
-from algorithm.processor import AlgorithmProcessor, ProjectInputs, UploadedFileMeta
+import numpy as np
+
+from algorithm.geometry_pipeline import _assemble_clipped_faces
+from algorithm.processor import (
+    PIECE_DTYPE,
+    AlgorithmProcessor,
+    ProjectInputs,
+    UploadedFileMeta,
+    _mass_stats,
+    _score_pieces,
+)
 from algorithm.obj_exporter import pieces_to_obj
 
+
+class ORJSONResponse(JSONResponse):
+    """Serialize dataclass trees directly with orjson.
+
+    Skips jsonable_encoder's recursive pure-Python walk; orjson handles
+    dataclasses natively and OPT_SERIALIZE_NUMPY covers any stray NumPy
+    scalars in the analytics dicts.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: object) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
 logging.basicConfig(level=logging.INFO)
 
 UPLOAD_DIR = Path(__file__).parent / "uploads"
@@ -30,28 +58,66 @@ app.add_middleware(
 
 processor = AlgorithmProcessor()
 
+# Serialized /api/process bodies keyed like the processor's result cache.
+# A hit skips the pipeline *and* serialization: one dict lookup, then the
+# stored bytes go straight out the socket.
+RESPONSE_CACHE_SIZE = 128
+_response_cache: OrderedDict[tuple, bytes] = OrderedDict()
+
+
+def _compile_kernels() -> None:
+    # Dummy-shaped arrays are enough to trigger compilation; calling the
+    # kernels directly avoids running the whole pipeline (which would hit
+    # the OpenAI API on boot when a key is configured). _mass_stats gets a
+    # structured-array column because numba specializes on layout: a plain
+    # contiguous vector here would leave the strided signature the real
+    # call sites use uncompiled.
+    _mass_stats(np.zeros(4, dtype=PIECE_DTYPE)["mass_kg"])
+    _score_pieces(np.zeros((4, 6)))
+    _assemble_clipped_faces(
+        np.empty((0, 3), dtype=np.int64),
+        np.empty((0, 3), dtype=bool),
+        np.empty((0, 3), dtype=np.int64),
+    )
+
+
+@app.on_event("startup")
+async def _warmup() -> None:
+    """Compile the JIT kernels before the first real request arrives.
+
+    Numba caches the machine code afterwards, so restarts only pay the
+    cache load. Off the event loop so startup stays responsive.
+    """
+
+    await run_in_threadpool(_compile_kernels)
 
-def _save_files(files: List[UploadFile], subdir: str) -> List[UploadedFileMeta]:
-    saved: List[UploadedFileMeta] = []
+
+CHUNK_SIZE = 1 << 20  # 1 MiB per read keeps memory bounded for LiDAR uploads
+
+
+async def _save_one(file: UploadFile, target_dir: Path) -> UploadedFileMeta:
+    path = target_dir / file.filename
+    size = 0
+    async with aiofiles.open(path, "wb") as f:
+        while chunk := await file.read(CHUNK_SIZE):
+            size += len(chunk)
+            await f.write(chunk)
+    return UploadedFileMeta(
+        filename=file.filename,
+        content_type=file.content_type or "application/octet-stream",
+        size_kb=round(size / 1024, 2),
+        path=str(path),
+    )
+
+
+async def _save_files(files: List[UploadFile], subdir: str) -> List[UploadedFileMeta]:
     target_dir = UPLOAD_DIR / subdir
     target_dir.mkdir(parents=True, exist_ok=True)
-
-    for file in files:
-        if not file:
-            continue
-        contents = file.file.read()
-        path = target_dir / file.filename
-        with open(path, "wb") as f:
-            f.write(contents)
-        saved.append(
-            UploadedFileMeta(
-                filename=file.filename,
-                content_type=file.content_type or "application/octet-stream",
-                size_kb=round(len(contents) / 1024, 2),
-                path=str(path),
-            )
-        )
-    return saved
+    # Overlap the writes instead of serializing them; gather preserves the
+    # submission order of the metadata list.
+    return list(
+        await asyncio.gather(*(_save_one(file, target_dir) for file in files if file))
+    )
 
 
 @app.post("/api/process")
@@ -68,8 +134,10 @@ async def process_project(
     asset_files: List[UploadFile] = File(default_factory=list),
     scan_files: List[UploadFile] = File(default_factory=list),
 ):
-    asset_meta = _save_files(asset_files, "assets")
-    scan_meta = _save_files(scan_files, "scans")
+    asset_meta, scan_meta = await asyncio.gather(
+        _save_files(asset_files, "assets"),
+        _save_files(scan_files, "scans"),
+    )
 
     inputs = ProjectInputs(
         project_name=project_name,
@@ -85,8 +153,18 @@ async def process_project(
         scans=scan_meta,
     )
 
-    result = processor.process(inputs)
-    return JSONResponse(jsonable_encoder(result))
+    key = processor._cache_key(inputs)
+    body = _response_cache.get(key)
+    if body is not None:
+        _response_cache.move_to_end(key)
+        return Response(content=body, media_type="application/json")
+
+    result = await run_in_threadpool(processor.process, inputs)
+    response = ORJSONResponse(result)
+    _response_cache[key] = response.body
+    if len(_response_cache) > RESPONSE_CACHE_SIZE:
+        _response_cache.popitem(last=False)
+    return response
 
 
 @app.post("/api/export-obj")
@@ -103,8 +181,10 @@ async def export_obj(
     asset_files: List[UploadFile] = File(default_factory=list),
     scan_files: List[UploadFile] = File(default_factory=list),
 ):
-    asset_meta = _save_files(asset_files, "assets")
-    scan_meta = _save_files(scan_files, "scans")
+    asset_meta, scan_meta = await asyncio.gather(
+        _save_files(asset_files, "assets"),
+        _save_files(scan_files, "scans"),
+    )
 
     inputs = ProjectInputs(
         project_name=project_name,
@@ -120,7 +200,7 @@ async def export_obj(
         scans=scan_meta,
     )
 
-    result = processor.process(inputs)
+    result = await run_in_threadpool(processor.process, inputs)
     obj_string = pieces_to_obj(result.piece_plans)
     return Response(
         content=obj_string,